@@ -1,3 +1,3 @@
 """Instagram image preparation tool."""
 
-__version__ = "0.1.2"
+__version__ = "0.1.3"
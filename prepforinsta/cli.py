@@ -1,6 +1,9 @@
 """CLI interface for Instagram image preparation tool."""
 
+import os
 import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
 from typing import List
 
@@ -22,15 +25,17 @@ def find_images(input_path: Path) -> List[Path]:
         if input_path.suffix.lower() in IMAGE_EXTENSIONS:
             images.append(input_path)
     elif input_path.is_dir():
-        # Directory - find all images
-        for ext in IMAGE_EXTENSIONS:
-            images.extend(input_path.glob(f'*{ext}'))
-            images.extend(input_path.glob(f'*{ext.upper()}'))
+        # Directory - find all images in a single pass
+        with os.scandir(input_path) as entries:
+            for entry in entries:
+                if entry.is_file() and Path(entry.name).suffix.lower() in IMAGE_EXTENSIONS:
+                    images.append(Path(entry.path))
     else:
         # Try glob pattern
         images.extend(Path('.').glob(str(input_path)))
 
-    return sorted(set(images))
+    images.sort()
+    return images
 
 
 @click.command()
@@ -63,6 +68,12 @@ def find_images(input_path: Path) -> List[Path]:
     is_flag=True,
     help='Overwrite existing output files (skipped by default).'
 )
+@click.option(
+    '--jobs', '-j',
+    type=click.IntRange(min=1),
+    default=None,
+    help='Number of images to process in parallel (defaults to CPU count).'
+)
 @click.option(
     '--dry-run',
     is_flag=True,
@@ -74,7 +85,7 @@ def find_images(input_path: Path) -> List[Path]:
     is_flag=True,
     help='Show detailed processing information.'
 )
-def main(input_path: str, output_path: str, quality: int, no_sharpen: bool, keep_exif: bool, max_size: float, force: bool, dry_run: bool, verbose: bool):
+def main(input_path: str, output_path: str, quality: int, no_sharpen: bool, keep_exif: bool, max_size: float, force: bool, jobs: int, dry_run: bool, verbose: bool):
     """
     Prepare images for Instagram publishing.
 
@@ -127,63 +138,106 @@ def main(input_path: str, output_path: str, quality: int, no_sharpen: bool, keep
     processor = ImageProcessor(start_quality=quality, no_sharpen=no_sharpen, keep_exif=keep_exif)
     success_count = 0
     skipped_count = 0
+    duplicate_count = 0
     error_count = 0
 
+    # Queue work, skipping outputs that already exist (unless --force).
+    # Sources sharing a stem (a.jpg, a.png) map to the same output, so the
+    # first one claims it and later ones are skipped rather than racing,
+    # even with --force.
+    pending = []
+    claimed_outputs = {}
+    for img_path in images:
+        output_file = output_path / f"{img_path.stem}.jpg"
+        if output_file in claimed_outputs:
+            duplicate_count += 1
+            if verbose:
+                click.echo(
+                    f"  Skipping {img_path.name} "
+                    f"(same output name as {claimed_outputs[output_file].name})"
+                )
+            continue
+        if output_file.exists() and not force:
+            skipped_count += 1
+            if verbose:
+                click.echo(f"  Skipping {img_path.name} (already exists)")
+            continue
+        claimed_outputs[output_file] = img_path
+        pending.append((img_path, output_file))
+
+    workers = jobs or os.cpu_count()
+
+    def submit(executor: ProcessPoolExecutor, img_path: Path, output_file: Path) -> Future:
+        if max_size:
+            return executor.submit(
+                processor.process_image_size_constrained,
+                img_path, output_file, max_size, verbose
+            )
+        return executor.submit(processor.process_image, img_path, output_file, verbose)
+
     with click.progressbar(
-        images,
+        length=len(pending),
         label='Processing images',
         show_pos=True,
         item_show_func=lambda x: x.name if x else ''
-    ) as progress_images:
-        for img_path in progress_images:
-            output_file = output_path / f"{img_path.stem}.jpg"
-
-            # Skip if output already exists (unless --force)
-            if output_file.exists() and not force:
-                skipped_count += 1
-                if verbose:
-                    click.echo(f"\n  Skipping {img_path.name} (already exists)")
-                continue
-
-            try:
-                if max_size:
-                    result = processor.process_image_size_constrained(
-                        img_path, output_file, max_size, verbose=verbose
-                    )
-                else:
-                    result = processor.process_image(img_path, output_file, verbose=verbose)
-                success_count += 1
-
-                if verbose:
-                    if max_size:
+    ) as bar, ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            # Each image is independent, so spread them across worker processes.
+            # Only a couple of images per worker are queued at a time, so
+            # Ctrl-C doesn't have to wait for the rest of the batch.
+            queue = iter(pending)
+            in_flight = {}
+            while True:
+                for img_path, output_file in islice(queue, 2 * workers - len(in_flight)):
+                    in_flight[submit(executor, img_path, output_file)] = (img_path, output_file)
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    img_path, output_file = in_flight.pop(future)
+                    bar.update(1, img_path)
+
+                    try:
+                        result = future.result()
+                        success_count += 1
+
+                        if verbose:
+                            if max_size:
+                                click.echo(
+                                    f"\n  {img_path.name} -> {output_file.name}\n"
+                                    f"    Original: {result['original_size'][0]}x{result['original_size'][1]}px\n"
+                                    f"    Final: {result['final_size'][0]}x{result['final_size'][1]}px\n"
+                                    f"    Quality: {result['quality']}\n"
+                                    f"    File size: {result['file_size_mb']:.2f} MB"
+                                )
+                            else:
+                                click.echo(
+                                    f"\n  {img_path.name} -> {output_file.name}\n"
+                                    f"    Orientation: {result['orientation']}\n"
+                                    f"    Size: {result['final_size'][0]}x{result['final_size'][1]}px\n"
+                                    f"    Quality: {result['quality']}\n"
+                                    f"    File size: {result['file_size_mb']:.2f} MB"
+                                )
+
+                    except Exception as e:
+                        error_count += 1
                         click.echo(
-                            f"\n  {img_path.name} -> {output_file.name}\n"
-                            f"    Original: {result['original_size'][0]}x{result['original_size'][1]}px\n"
-                            f"    Final: {result['final_size'][0]}x{result['final_size'][1]}px\n"
-                            f"    Quality: {result['quality']}\n"
-                            f"    File size: {result['file_size_mb']:.2f} MB"
+                            click.style(f"\n  Error processing {img_path.name}: {e}", fg='red'),
+                            err=True
                         )
-                    else:
-                        click.echo(
-                            f"\n  {img_path.name} -> {output_file.name}\n"
-                            f"    Orientation: {result['orientation']}\n"
-                            f"    Size: {result['final_size'][0]}x{result['final_size'][1]}px\n"
-                            f"    Quality: {result['quality']}\n"
-                            f"    File size: {result['file_size_mb']:.2f} MB"
-                        )
-
-            except Exception as e:
-                error_count += 1
-                click.echo(
-                    click.style(f"\n  Error processing {img_path.name}: {e}", fg='red'),
-                    err=True
-                )
+        except BaseException:
+            # Drop queued images instead of letting the executor finish them
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
 
     # Summary
     click.echo(f"\n{click.style('Done!', fg='green', bold=True)}")
     click.echo(f"Successfully processed: {success_count}")
     if skipped_count > 0:
         click.echo(f"Skipped (already exist): {skipped_count}")
+    if duplicate_count > 0:
+        click.echo(f"Skipped (duplicate output name): {duplicate_count}")
     if error_count > 0:
         click.echo(click.style(f"Errors: {error_count}", fg='red'))
     click.echo(f"Output location: {output_path}")
@@ -1,8 +1,10 @@
 """Image processing logic for Instagram preparation."""
 
+import functools
 import io
+import os
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 
 import piexif
 from PIL import Image, ImageFilter, ImageCms
@@ -18,11 +20,24 @@ class ImageProcessor:
     MAX_FILE_SIZE_MB = 8
     MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
+    # Box-reduce by an integer factor before LANCZOS when downscaling by more
+    # than this factor (Pillow's thumbnail() default)
+    RESIZE_REDUCING_GAP = 2.0
+
+    # Smallest (long, short) edge JPEG sources are decoded at via draft()
+    DRAFT_MIN_SIZE = (2700, 1800)
+
     # Sharpening parameters for screen viewing (subtle, professional levels)
     SHARPEN_RADIUS = 0.8
     SHARPEN_PERCENT = 50
     SHARPEN_THRESHOLD = 2
 
+    # Lowest JPEG quality the size search will go down to
+    MIN_QUALITY = 60
+
+    # Built on first use and shared by every image in the batch
+    _SRGB_PROFILE = None
+
     def __init__(self, start_quality: int = 100, no_sharpen: bool = False, keep_exif: bool = False):
         """Initialize processor with options."""
         self.start_quality = start_quality
@@ -33,10 +48,9 @@ class ImageProcessor:
     def _get_orientation(img: Image.Image) -> str:
         """Determine if image is portrait, landscape, or square."""
         width, height = img.size
-        aspect_ratio = width / height
 
-        # Consider square if within 2% of 1:1
-        if 0.98 <= aspect_ratio <= 1.02:
+        # Consider square if within 2% of 1:1 (integer form of 0.98 <= w/h <= 1.02)
+        if abs(width - height) * 100 <= height * 2:
             return "square"
         elif height > width:
             return "portrait"
@@ -44,32 +58,48 @@ class ImageProcessor:
             return "landscape"
 
     @staticmethod
-    def _center_crop_to_ratio(img: Image.Image, target_ratio: float) -> Image.Image:
-        """Center crop image to target aspect ratio (width/height)."""
-        width, height = img.size
+    def _center_crop_box(size: Tuple[int, int], target_ratio: float) -> Tuple[int, int, int, int]:
+        """Compute the centered crop box matching target aspect ratio (width/height)."""
+        width, height = size
         current_ratio = width / height
 
         if current_ratio > target_ratio:
             # Image is too wide, crop width
             new_width = int(height * target_ratio)
             left = (width - new_width) // 2
-            img = img.crop((left, 0, left + new_width, height))
+            return (left, 0, left + new_width, height)
         else:
             # Image is too tall, crop height
             new_height = int(width / target_ratio)
             top = (height - new_height) // 2
-            img = img.crop((0, top, width, top + new_height))
-
-        return img
+            return (0, top, width, top + new_height)
+
+    @classmethod
+    def _crop_and_resize(cls, img: Image.Image, target_size: Tuple[int, int]) -> Image.Image:
+        """Center crop to target_size's aspect ratio and scale down in a single resample."""
+        target_width, target_height = target_size
+        box = cls._center_crop_box(img.size, target_width / target_height)
+        crop_width = box[2] - box[0]
+        crop_height = box[3] - box[1]
+
+        # Never upscale, matching thumbnail() behaviour
+        if crop_width <= target_width and crop_height <= target_height:
+            return img.crop(box)
+
+        scale = min(target_width / crop_width, target_height / crop_height)
+        new_size = (max(1, round(crop_width * scale)), max(1, round(crop_height * scale)))
+        return img.resize(
+            new_size, Image.Resampling.LANCZOS, box=box, reducing_gap=cls.RESIZE_REDUCING_GAP
+        )
 
-    @staticmethod
-    def _resize_to_fit(img: Image.Image, max_size: Tuple[int, int]) -> Image.Image:
+    @classmethod
+    def _resize_to_fit(cls, img: Image.Image, max_size: Tuple[int, int]) -> Image.Image:
         """Resize image to fit within max_size while maintaining aspect ratio."""
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+        img.thumbnail(max_size, Image.Resampling.LANCZOS, reducing_gap=cls.RESIZE_REDUCING_GAP)
         return img
 
-    @staticmethod
-    def _resize_landscape(img: Image.Image, max_long_edge: int) -> Image.Image:
+    @classmethod
+    def _resize_landscape(cls, img: Image.Image, max_long_edge: int) -> Image.Image:
         """Resize landscape image so longest edge is max_long_edge."""
         width, height = img.size
         if width > height:
@@ -77,17 +107,26 @@ class ImageProcessor:
             if width > max_long_edge:
                 new_width = max_long_edge
                 new_height = int(height * (max_long_edge / width))
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                img = img.resize(
+                    (new_width, new_height),
+                    Image.Resampling.LANCZOS,
+                    reducing_gap=cls.RESIZE_REDUCING_GAP
+                )
         else:
             # Height is longer
             if height > max_long_edge:
                 new_height = max_long_edge
                 new_width = int(width * (max_long_edge / height))
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+                img = img.resize(
+                    (new_width, new_height),
+                    Image.Resampling.LANCZOS,
+                    reducing_gap=cls.RESIZE_REDUCING_GAP
+                )
         return img
 
     def _apply_screen_sharpening(self, img: Image.Image) -> Image.Image:
         """Apply unsharp mask sharpening optimized for screen viewing."""
+        # Pillow's built-in filter keeps sharpening free of numpy/scipy
         return img.filter(
             ImageFilter.UnsharpMask(
                 radius=self.SHARPEN_RADIUS,
@@ -96,20 +135,34 @@ class ImageProcessor:
             )
         )
 
-    @staticmethod
-    def _convert_to_srgb(img: Image.Image) -> Image.Image:
+    @classmethod
+    def _get_srgb_profile(cls) -> ImageCms.ImageCmsProfile:
+        """Return the shared sRGB profile, creating it on first use."""
+        if cls._SRGB_PROFILE is None:
+            cls._SRGB_PROFILE = ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB"))
+        return cls._SRGB_PROFILE
+
+    @classmethod
+    @functools.lru_cache(maxsize=32)
+    def _get_srgb_transform(cls, icc_profile: bytes) -> ImageCms.ImageCmsTransform:
+        """Build (once per distinct embedded profile) an RGB transform to sRGB."""
+        input_profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+        return ImageCms.buildTransform(input_profile, cls._get_srgb_profile(), 'RGB', 'RGB')
+
+    @classmethod
+    def _convert_to_srgb(cls, img: Image.Image) -> Image.Image:
         """Convert image to sRGB color space (Instagram standard)."""
         # If image has an embedded profile, convert to sRGB
         if img.mode == 'RGB' and 'icc_profile' in img.info:
             try:
-                # Create sRGB profile
-                srgb_profile = ImageCms.createProfile("sRGB")
-
-                # Get the embedded profile
-                input_profile = ImageCms.ImageCmsProfile(io.BytesIO(img.info['icc_profile']))
-
-                # Convert to sRGB
-                img = ImageCms.profileToProfile(img, input_profile, srgb_profile, outputMode='RGB')
+                # Galleries usually share one camera/export profile, so the
+                # transform is cached by the embedded profile's bytes
+                transform = cls._get_srgb_transform(img.info['icc_profile'])
+
+                # Convert in place - img is already this pipeline's own copy,
+                # so there's no need for a second full-size buffer
+                img.load()
+                ImageCms.applyTransform(img, transform, inPlace=True)
             except Exception:
                 # If conversion fails, just continue without conversion
                 pass
@@ -142,6 +195,83 @@ class ImageProcessor:
 
         return new_exif
 
+    @staticmethod
+    def _encode_jpeg(
+        img: Image.Image,
+        quality: int,
+        exif_bytes: bytes = None
+    ) -> io.BytesIO:
+        """Encode image as progressive JPEG into an in-memory buffer."""
+        buffer = io.BytesIO()
+        save_kwargs = {
+            "format": "JPEG",
+            "quality": quality,
+            "optimize": True,
+            "progressive": True,
+        }
+        if exif_bytes:
+            save_kwargs["exif"] = exif_bytes
+        img.save(buffer, **save_kwargs)
+        return buffer
+
+    def _search_quality(
+        self,
+        img: Image.Image,
+        min_quality: int,
+        max_quality: int,
+        max_size_bytes: int,
+        exif_bytes: bytes = None
+    ) -> Tuple[Optional[int], Optional[io.BytesIO]]:
+        """
+        Binary search for the highest quality that fits within max_size_bytes.
+
+        Returns (quality, buffer). If nothing fits, quality is None and buffer
+        holds the min_quality encode, which is always the last one tried.
+        """
+        best_quality = None
+        best_buffer = None
+
+        while min_quality <= max_quality:
+            mid_quality = (min_quality + max_quality) // 2
+            buffer = self._encode_jpeg(img, mid_quality, exif_bytes)
+
+            if buffer.tell() <= max_size_bytes:
+                # Fits - try higher quality
+                best_quality = mid_quality
+                best_buffer = buffer
+                min_quality = mid_quality + 1
+            else:
+                # Too large - try lower quality
+                max_quality = mid_quality - 1
+                if best_quality is None:
+                    best_buffer = buffer
+
+        return best_quality, best_buffer
+
+    @staticmethod
+    def _write_buffer(buffer: io.BytesIO, output_path: Path) -> None:
+        """
+        Write an encoded buffer to disk without copying it to bytes first.
+
+        Writes to a temporary file beside the output and renames it into place,
+        so a failed write never leaves a truncated JPEG behind.
+        """
+        tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+        # 0o666 so the umask decides permissions, as with Path.write_bytes
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            try:
+                with buffer.getbuffer() as view:
+                    written = 0
+                    while written < len(view):
+                        written += os.write(fd, view[written:])
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
     def _save_with_size_optimization(
         self,
         img: Image.Image,
@@ -149,36 +279,23 @@ class ImageProcessor:
         exif_bytes: bytes = None
     ) -> int:
         """Save image as progressive JPEG, optimizing quality to stay under size limit."""
-        quality = self.start_quality
-        min_quality = 60
-
-        while quality >= min_quality:
-            buffer = io.BytesIO()
-            save_kwargs = {
-                "format": "JPEG",
-                "quality": quality,
-                "optimize": True,
-                "progressive": True,
-            }
-
-            if exif_bytes:
-                save_kwargs["exif"] = exif_bytes
-
-            img.save(buffer, **save_kwargs)
-            size = buffer.tell()
-
-            if size <= self.MAX_FILE_SIZE_BYTES:
-                # Size is acceptable, save to file
-                output_path.write_bytes(buffer.getvalue())
-                return quality
-
-            # File too large, reduce quality
-            quality -= 5
+        # Most images fit at the starting quality, so try that first
+        buffer = self._encode_jpeg(img, self.start_quality, exif_bytes)
+        size = buffer.tell()
+        if size <= self.MAX_FILE_SIZE_BYTES or self.start_quality <= self.MIN_QUALITY:
+            self._write_buffer(buffer, output_path)
+            return self.start_quality
+
+        # Binary search for highest quality that fits
+        best_quality, best_buffer = self._search_quality(
+            img, self.MIN_QUALITY, self.start_quality - 1, self.MAX_FILE_SIZE_BYTES, exif_bytes
+        )
+        if best_quality is None:
+            # Even at minimum quality it's too large, save anyway
+            best_quality = self.MIN_QUALITY
 
-        # Even at minimum quality, save anyway
-        buffer.seek(0)
-        output_path.write_bytes(buffer.getvalue())
-        return quality
+        self._write_buffer(best_buffer, output_path)
+        return best_quality
 
     def process_image(self, input_path: Path, output_path: Path, verbose: bool = False) -> dict:
         """
@@ -189,6 +306,16 @@ class ImageProcessor:
         # Load image
         img = Image.open(input_path)
 
+        # Let libjpeg decode at a reduced 1/N scale, keeping at least 2x a
+        # 3:2 landscape output (1350x900) along each axis of the source so
+        # LANCZOS still has plenty of source pixels
+        if img.format == 'JPEG':
+            long_edge, short_edge = self.DRAFT_MIN_SIZE
+            if img.width >= img.height:
+                img.draft('RGB', (long_edge, short_edge))
+            else:
+                img.draft('RGB', (short_edge, long_edge))
+
         # Handle EXIF orientation
         try:
             img = Image.exif_transpose(img)
@@ -197,9 +324,10 @@ class ImageProcessor:
 
         # Handle EXIF data (strip by default for privacy)
         exif_bytes = None
-        if self.keep_exif:
+        if self.keep_exif and 'exif' in img.info:
             try:
-                exif_dict = piexif.load(input_path.as_posix())
+                # Reuse the EXIF block Pillow already read rather than re-reading the file
+                exif_dict = piexif.load(img.info['exif'])
                 filtered_exif = self._preserve_gps_datetime(exif_dict)
                 exif_bytes = piexif.dump(filtered_exif)
             except Exception:
@@ -212,8 +340,7 @@ class ImageProcessor:
         # Process based on orientation
         if orientation == "portrait":
             # Crop to 4:5 and resize to 1080x1350
-            img = self._center_crop_to_ratio(img, 4/5)
-            img = self._resize_to_fit(img, self.PORTRAIT_SIZE)
+            img = self._crop_and_resize(img, self.PORTRAIT_SIZE)
         elif orientation == "landscape":
             # Resize to max long edge 1350
             img = self._resize_landscape(img, self.LANDSCAPE_MAX_LONG_EDGE)
@@ -265,9 +392,10 @@ class ImageProcessor:
 
         # Handle EXIF data (strip by default for privacy)
         exif_bytes = None
-        if self.keep_exif:
+        if self.keep_exif and 'exif' in img.info:
             try:
-                exif_dict = piexif.load(input_path.as_posix())
+                # Reuse the EXIF block Pillow already read rather than re-reading the file
+                exif_dict = piexif.load(img.info['exif'])
                 filtered_exif = self._preserve_gps_datetime(exif_dict)
                 exif_bytes = piexif.dump(filtered_exif)
             except Exception:
@@ -307,23 +435,9 @@ class ImageProcessor:
         """
         current_img = img
 
-        def encode_to_buffer(image: Image.Image, q: int) -> io.BytesIO:
-            """Encode image to JPEG buffer at given quality."""
-            buffer = io.BytesIO()
-            save_kwargs = {
-                "format": "JPEG",
-                "quality": q,
-                "optimize": True,
-                "progressive": True,
-            }
-            if exif_bytes:
-                save_kwargs["exif"] = exif_bytes
-            image.save(buffer, **save_kwargs)
-            return buffer
-
         # Step 1: Scale down if needed (at high quality) to get roughly under limit
         for _ in range(5):  # Max 5 scaling iterations
-            buffer = encode_to_buffer(current_img, 95)
+            buffer = self._encode_jpeg(current_img, 95, exif_bytes)
             size = buffer.tell()
 
             if size <= max_size_bytes:
@@ -345,28 +459,13 @@ class ImageProcessor:
             )
 
         # Step 2: Binary search for highest quality that fits
-        min_quality = 60
-        max_quality = 100
-        best_quality = min_quality
-        best_buffer = None
-
-        while min_quality <= max_quality:
-            mid_quality = (min_quality + max_quality) // 2
-            buffer = encode_to_buffer(current_img, mid_quality)
-            size = buffer.tell()
-
-            if size <= max_size_bytes:
-                # Fits - try higher quality
-                best_quality = mid_quality
-                best_buffer = buffer
-                min_quality = mid_quality + 1
-            else:
-                # Too large - try lower quality
-                max_quality = mid_quality - 1
+        best_quality, best_buffer = self._search_quality(
+            current_img, self.MIN_QUALITY, 100, max_size_bytes, exif_bytes
+        )
 
         # Save the best result
-        if best_buffer:
-            output_path.write_bytes(best_buffer.getvalue())
+        if best_quality is not None:
+            self._write_buffer(best_buffer, output_path)
         else:
             # Fallback: couldn't fit even at min quality, scale more aggressively
             scale_factor = 0.8
@@ -374,8 +473,8 @@ class ImageProcessor:
                 (int(current_img.width * scale_factor), int(current_img.height * scale_factor)),
                 Image.Resampling.LANCZOS
             )
-            buffer = encode_to_buffer(current_img, 80)
-            output_path.write_bytes(buffer.getvalue())
+            buffer = self._encode_jpeg(current_img, 80, exif_bytes)
+            self._write_buffer(buffer, output_path)
             best_quality = 80
 
         return best_quality, current_img